@@ -2,8 +2,16 @@ import pandas as pd
 import re
 from fuzzywuzzy import fuzz
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 import os
+import csv
+import queue
+import threading
+from openpyxl import Workbook
+
+# Number of rows collected before they are written out and progress is reported
+CHUNK_SIZE = 1000
+RESULT_COLUMNS = ['Name', 'Registration', 'Normalized Registration', 'Similarity']
 
 # Mapping for common number-to-letter substitutions
 substitution_map = {
@@ -37,27 +45,126 @@ def normalize_text(text):
         normalized.append(substitution_map.get(char, char))
     return ''.join(normalized)
 
-def check_for_similar_names(names, registrations, threshold=80):
+def iter_similar_names(names, registrations):
     """
-    Check if any registration plate (normalized) is a close fuzzy match
-    to any of the given names (also normalized), using fuzzy matching.
-    Returns a list of tuples: (target name, original registration, normalized registration, similarity score).
+    Generate comparisons one registration at a time.
+    Yields a list of tuples per registration: (target name, original registration, normalized registration, similarity score).
     """
-    similar_registrations = []
-    all_comparisons = []
     # Normalize target names
     normalized_names = {name: normalize_text(name) for name in names}
     for registration in registrations:
         normalized_registration = normalize_text(registration)
+        comparisons = []
         for name, normalized_name in normalized_names.items():
             # Use fuzzy partial ratio to allow extra characters around the match
             similarity = fuzz.partial_ratio(normalized_name, normalized_registration)
-            # Store all comparisons
-            all_comparisons.append((name, registration, normalized_registration, similarity))
-            if similarity >= threshold:
-                similar_registrations.append((name, registration, normalized_registration, similarity))
+            comparisons.append((name, registration, normalized_registration, similarity))
+        yield comparisons
+
+def check_for_similar_names(names, registrations, threshold=80):
+    """
+    Check if any registration plate (normalized) is a close fuzzy match
+    to any of the given names (also normalized), using fuzzy matching.
+    Returns a list of tuples: (target name, original registration, normalized registration, similarity score).
+    """
+    similar_registrations = []
+    all_comparisons = []
+    for comparisons in iter_similar_names(names, registrations):
+        # Store all comparisons
+        all_comparisons.extend(comparisons)
+        similar_registrations.extend(c for c in comparisons if c[3] >= threshold)
     return similar_registrations, all_comparisons
 
+class ExcelResultWriter:
+    """
+    Write comparisons and matches to a write-only workbook, streaming rows to disk as they are added.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.workbook = Workbook(write_only=True)
+        self.all_sheet = self.workbook.create_sheet('All Comparisons')
+        self.matches_sheet = self.workbook.create_sheet('Matches')
+        self.all_sheet.append(RESULT_COLUMNS)
+        self.matches_sheet.append(RESULT_COLUMNS)
+
+    def write(self, comparisons, matches):
+        for row in comparisons:
+            self.all_sheet.append(row)
+        for row in matches:
+            self.matches_sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.output_path)
+
+class CsvResultWriter:
+    """
+    Write comparisons to the output CSV and matches to a '_matches' CSV next to it.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        base_path, extension = os.path.splitext(output_path)
+        self.matches_path = f"{base_path}_matches{extension}"
+        self.all_file = open(output_path, 'w', newline='', encoding='utf-8')
+        self.matches_file = open(self.matches_path, 'w', newline='', encoding='utf-8')
+        self.all_writer = csv.writer(self.all_file)
+        self.matches_writer = csv.writer(self.matches_file)
+        self.all_writer.writerow(RESULT_COLUMNS)
+        self.matches_writer.writerow(RESULT_COLUMNS)
+
+    def write(self, comparisons, matches):
+        self.all_writer.writerows(comparisons)
+        self.matches_writer.writerows(matches)
+
+    def close(self):
+        self.all_file.close()
+        self.matches_file.close()
+
+def comparison_worker(file_path, names_to_check, output_path, use_csv, progress_queue, cancel_event, threshold=80):
+    """
+    Run the comparison in a background thread, writing results in chunks as they are produced.
+    Reports ('total', n), ('progress', n), ('done', path), ('cancelled', None) or ('error', message)
+    on progress_queue; the UI thread polls the queue and updates the window.
+    """
+    writer = None
+    try:
+        df = pd.read_excel(file_path, header=None, skiprows=5)
+        registrations = df.iloc[:, 1].dropna().tolist()
+        progress_queue.put(('total', len(registrations)))
+
+        writer = CsvResultWriter(output_path) if use_csv else ExcelResultWriter(output_path)
+        chunk = []
+        chunk_matches = []
+        for processed, comparisons in enumerate(iter_similar_names(names_to_check, registrations), start=1):
+            if cancel_event.is_set():
+                writer.write(chunk, chunk_matches)
+                writer.close()
+                writer = None
+                progress_queue.put(('cancelled', None))
+                return
+            chunk.extend(comparisons)
+            chunk_matches.extend(c for c in comparisons if c[3] >= threshold)
+            if len(chunk) >= CHUNK_SIZE:
+                writer.write(chunk, chunk_matches)
+                chunk = []
+                chunk_matches = []
+                progress_queue.put(('progress', processed))
+
+        writer.write(chunk, chunk_matches)
+        writer.close()
+        writer = None
+        progress_queue.put(('progress', len(registrations)))
+        progress_queue.put(('done', output_path))
+    except Exception as e:
+        progress_queue.put(('error', str(e)))
+    finally:
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
 def load_file():
     file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx")])
     if file_path:
@@ -70,6 +177,10 @@ def add_name():
         names_listbox.insert(tk.END, name)
         name_entry.delete(0, tk.END)
 
+def set_running(running):
+    run_button.config(state=tk.DISABLED if running else tk.NORMAL)
+    cancel_button.config(state=tk.NORMAL if running else tk.DISABLED)
+
 def run_comparison():
     file_path = file_entry.get()
     if not file_path:
@@ -81,23 +192,55 @@ def run_comparison():
         messagebox.showerror("Error", "Please add names to check.")
         return
 
-    try:
-        df = pd.read_excel(file_path, header=None, skiprows=5)
-        registrations = df.iloc[:, 1].dropna().tolist()
-        matches, all_comparisons = check_for_similar_names(names_to_check, registrations, threshold=80)
+    use_csv = csv_var.get()
+    output_file_path = os.path.abspath('./Registration_Matches.csv' if use_csv else './Registration_Matches.xlsx')
 
-        df_all_comparisons = pd.DataFrame(all_comparisons, columns=['Name', 'Registration', 'Normalized Registration', 'Similarity'])
-        df_matches = pd.DataFrame(matches, columns=['Name', 'Registration', 'Normalized Registration', 'Similarity'])
+    cancel_event.clear()
+    progress_bar.config(value=0, maximum=1)
+    status_label.config(text="Reading file...")
+    set_running(True)
+    threading.Thread(
+        target=comparison_worker,
+        args=(file_path, names_to_check, output_file_path, use_csv, progress_queue, cancel_event),
+        daemon=True
+    ).start()
+    root.after(100, poll_progress)
 
-        output_file_path = os.path.abspath('./Registration_Matches.xlsx')
-        with pd.ExcelWriter(output_file_path) as writer:
-            df_all_comparisons.to_excel(writer, sheet_name='All Comparisons', index=False)
-            df_matches.to_excel(writer, sheet_name='Matches', index=False)
+def cancel_comparison():
+    cancel_event.set()
+    status_label.config(text="Cancelling...")
 
-        messagebox.showinfo("Success", f"Results have been written to {output_file_path}")
-        os.startfile(output_file_path)  # Open the Excel file
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
+def poll_progress():
+    """
+    Apply progress messages from the worker thread; reschedules itself until the worker finishes.
+    """
+    try:
+        while True:
+            kind, value = progress_queue.get_nowait()
+            if kind == 'total':
+                progress_bar.config(maximum=max(value, 1))
+                status_label.config(text=f"0 of {value} registrations")
+            elif kind == 'progress':
+                progress_bar.config(value=value)
+                status_label.config(text=f"{value} of {int(progress_bar.cget('maximum'))} registrations")
+            elif kind == 'done':
+                set_running(False)
+                status_label.config(text="Done")
+                messagebox.showinfo("Success", f"Results have been written to {value}")
+                os.startfile(value)  # Open the output file
+                return
+            elif kind == 'cancelled':
+                set_running(False)
+                status_label.config(text="Cancelled (partial results were written)")
+                return
+            elif kind == 'error':
+                set_running(False)
+                status_label.config(text="")
+                messagebox.showerror("Error", value)
+                return
+    except queue.Empty:
+        pass
+    root.after(100, poll_progress)
 
 # Create the main window
 root = tk.Tk()
@@ -123,7 +266,22 @@ default_names = ["Asim", "Suna", "Sue", "Kay", "Kayhan", "Kai", "Niz"]
 for name in default_names:
     names_listbox.insert(tk.END, name)
 
-tk.Button(root, text="Run Comparison", command=run_comparison).grid(row=3, column=0, columnspan=3, padx=10, pady=10)
+csv_var = tk.BooleanVar(value=False)
+tk.Checkbutton(root, text="Write CSV instead of Excel", variable=csv_var).grid(row=3, column=0, columnspan=3, padx=10, pady=5)
+
+run_button = tk.Button(root, text="Run Comparison", command=run_comparison)
+run_button.grid(row=4, column=0, columnspan=2, padx=10, pady=10)
+cancel_button = tk.Button(root, text="Cancel", command=cancel_comparison, state=tk.DISABLED)
+cancel_button.grid(row=4, column=2, padx=10, pady=10)
+
+progress_bar = ttk.Progressbar(root, length=400, mode='determinate')
+progress_bar.grid(row=5, column=0, columnspan=3, padx=10, pady=5)
+status_label = tk.Label(root, text="")
+status_label.grid(row=6, column=0, columnspan=3, padx=10, pady=5)
+
+# Communication with the background comparison worker
+progress_queue = queue.Queue()
+cancel_event = threading.Event()
 
 # Start the main event loop
 root.mainloop()
\ No newline at end of file
@@ -5,9 +5,10 @@ from fastapi.responses import JSONResponse
 import pandas as pd
 from fuzzywuzzy import fuzz
 import io
-from app.routes.scraper import router as scraper_router, scrape_auction_data  # Import the router and function
+from app.routes.scraper import router as scraper_router, scrape_auction_data, fetch_lot_details  # Import the router and functions
 from dotenv import load_dotenv
 from .routes import status  # Add this import
+from app.plate_store import PlateStore
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +17,7 @@ load_dotenv()
 HOST = os.getenv('HOST', '0.0.0.0')
 PORT = int(os.getenv('PORT', 8080))
 CORS_ORIGINS = os.getenv('CORS_ORIGINS', '').split(',')
+PLATE_STORE_DIR = os.getenv('PLATE_STORE_DIR', '')
 
 app = FastAPI()
 
@@ -32,6 +34,9 @@ app.add_middleware(
 # Create a new router
 router = APIRouter()
 
+# Memory-mapped historical plates, shared with the other worker processes through the page cache
+plate_store = PlateStore(PLATE_STORE_DIR) if PLATE_STORE_DIR else None
+
 # Mapping for common number-to-letter substitutions
 substitution_map = {
     '4': 'A',  # 4 can be A
@@ -64,6 +69,17 @@ def normalize_text(text):
         normalized.append(substitution_map.get(char, char))
     return ''.join(normalized)
 
+# Translation table built from the substitution map for bulk normalization
+substitution_table = str.maketrans(substitution_map)
+
+def normalize_many(texts):
+    """
+    Normalize an iterable of texts in one pass.
+    Produces the same output as calling normalize_text on each item,
+    but uses a single translation table instead of a per-character loop.
+    """
+    return [str(text).strip().upper().replace(" ", "").translate(substitution_table) for text in texts]
+
 def check_for_similar_names(names, registrations):
     """
     Check if any registration plate (normalized) is a close fuzzy match
@@ -88,10 +104,86 @@ def check_for_similar_names(names, registrations):
             })
     return all_comparisons
 
+def group_similar_names(names, registrations, cutoff=80):
+    """
+    Grouped variant of check_for_similar_names that returns one record per lot.
+    The scores for each lot are reduced as they are computed, keeping only the
+    best-matching name and any other names scoring at or above the cutoff.
+    Returns a list of dictionaries:
+    {lot_number, name, registration, normalized_registration, similarity, other_matches}
+    where name/similarity are the best match and other_matches is a list of {name, similarity}.
+    """
+    grouped_comparisons = []
+    # Normalize target names
+    normalized_names = {name: normalize_text(name) for name in names}
+    for lot_number, registration in registrations:
+        normalized_registration = normalize_text(registration)
+        best_name = None
+        best_similarity = -1
+        other_matches = []
+        for name, normalized_name in normalized_names.items():
+            similarity = fuzz.partial_ratio(normalized_name, normalized_registration)
+            if similarity > best_similarity:
+                # The previous best is demoted to the other matches if it passes the cutoff
+                if best_name is not None and best_similarity >= cutoff:
+                    other_matches.append({"name": best_name, "similarity": best_similarity})
+                best_name, best_similarity = name, similarity
+            elif similarity >= cutoff:
+                other_matches.append({"name": name, "similarity": similarity})
+        if best_name is None:
+            continue
+        other_matches.sort(key=lambda match: match["similarity"], reverse=True)
+        grouped_comparisons.append({
+            "lot_number": lot_number,
+            "name": best_name,
+            "registration": registration,
+            "normalized_registration": normalized_registration,
+            "similarity": best_similarity,
+            "other_matches": other_matches
+        })
+    return grouped_comparisons
+
+def match_registrations(names, registrations, grouped=False, cutoff=80):
+    """
+    Run either the per-name or the grouped per-lot matcher.
+    """
+    if grouped:
+        return group_similar_names(names, registrations, cutoff=cutoff)
+    return check_for_similar_names(names, registrations)
+
+def check_plate_store(names, store, cutoff=80):
+    """
+    Match names against the historical plates in a PlateStore.
+    Records that cannot reach the cutoff are skipped using the bigram index
+    (see PlateStore.candidates), and the stored normalized plates are used as-is.
+    Returns a list of dictionaries:
+    {auction_id, lot_number, name, registration, normalized_registration, similarity}
+    for every comparison at or above the cutoff.
+    """
+    matches = []
+    # Normalize target names
+    normalized_names = {name: normalize_text(name) for name in names}
+    for index in store.candidates(normalized_names.values(), cutoff):
+        auction_id, lot_number, registration, normalized_registration = store.record(index)
+        for name, normalized_name in normalized_names.items():
+            similarity = fuzz.partial_ratio(normalized_name, normalized_registration)
+            if similarity >= cutoff:
+                matches.append({
+                    "auction_id": auction_id,
+                    "lot_number": lot_number,
+                    "name": name,
+                    "registration": registration,
+                    "normalized_registration": normalized_registration,
+                    "similarity": similarity
+                })
+    return matches
+
 @router.post("/uploadfile/")
 async def create_upload_file(
     file: UploadFile = File(...),
-    names: str = Form(default="")
+    names: str = Form(default=""),
+    grouped: bool = Form(default=False),
+    cutoff: int = Form(default=80)
 ):
     try:
         # Read the uploaded file
@@ -105,7 +197,7 @@ async def create_upload_file(
         names_to_check = names.split(',') if names else []
 
         # Get similar registrations using fuzzy matching
-        all_comparisons = check_for_similar_names(names_to_check, registrations)
+        all_comparisons = match_registrations(names_to_check, registrations, grouped=grouped, cutoff=cutoff)
 
         return JSONResponse(content={"comparisons": all_comparisons})
     except Exception as e:
@@ -116,7 +208,7 @@ async def health_check():
     return {"status": "ok"}
 
 @router.get("/scrape/{auction_id}")
-async def scrape_auction(auction_id: str, names: str):
+async def scrape_auction(auction_id: str, names: str, grouped: bool = False, cutoff: int = 80, enrich: bool = False):
     try:
         # Scrape auction data
         auction_data = await scrape_auction_data(auction_id)
@@ -126,23 +218,46 @@ async def scrape_auction(auction_id: str, names: str):
 
         # Get similar registrations using fuzzy matching
         registrations = [(item["lot_number"], item["registration"]) for item in auction_data]
-        all_comparisons = check_for_similar_names(names_to_check, registrations)
-
-        # # Include additional information in the response
-        # for comparison in all_comparisons:
-        #     for item in auction_data:
-        #         if comparison["lot_number"] == item["lot_number"]:
-        #             comparison.update({
-        #                 "reserve_price": item["reserve_price"],
-        #                 "current_price": item["current_price"],
-        #                 "end_time": item["end_time"],
-        #                 "lot_url": item["lot_url"],
-        #             })
+        all_comparisons = match_registrations(names_to_check, registrations, grouped=grouped, cutoff=cutoff)
+
+        # Include lot details (prices, end time, URL), fetched only for lots that matched
+        if enrich:
+            lot_urls = {item["lot_number"]: item["lot_url"] for item in auction_data if item["lot_url"]}
+            matched_lots = {
+                comparison["lot_number"]
+                for comparison in all_comparisons
+                if comparison["similarity"] >= cutoff and comparison["lot_number"] in lot_urls
+            }
+            lot_details = await fetch_lot_details({lot_number: lot_urls[lot_number] for lot_number in matched_lots})
+            for comparison in all_comparisons:
+                details = lot_details.get(comparison["lot_number"])
+                if details:
+                    comparison.update(details)
 
         return JSONResponse(content={"comparisons": all_comparisons})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/history/match")
+async def match_history(names: str, cutoff: int = 80):
+    if plate_store is None:
+        raise HTTPException(status_code=503, detail="No PLATE_STORE_DIR environment variable found")
+    try:
+        published = plate_store.refresh()
+    except OSError as e:
+        raise HTTPException(status_code=503, detail=f"Plate store could not be loaded: {str(e)}")
+    if not published:
+        raise HTTPException(status_code=404, detail="No plate store has been published yet")
+    try:
+        # Convert names to list (if empty string, use empty list)
+        names_to_check = names.split(',') if names else []
+
+        matches = check_plate_store(names_to_check, plate_store, cutoff=cutoff)
+
+        return JSONResponse(content={"version": plate_store.version, "comparisons": matches})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/")
 async def root():
     return {"message": "Welcome to Plate Matcher API"}
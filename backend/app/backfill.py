@@ -0,0 +1,292 @@
+"""
+Bulk backfill of historical auctions into the auctions/registrations tables.
+
+Reads a directory of archived auction files, either spreadsheets in the same
+layout the /uploadfile/ endpoint expects or saved auction HTML pages, and
+loads them into Postgres.
+
+Usage (from the backend directory):
+    python -m app.backfill /path/to/archive [--workers 4] [--batch-size 5000] [--force]
+                                            [--plate-store DIR]
+
+Each file is one auction; the auction ID is taken from the file name
+(e.g. 2024-05.xlsx -> auction "2024-05"). Files are parsed in worker
+processes and rows are streamed into registrations with COPY. Each auction is
+loaded in its own transaction, so an interrupted run can simply be restarted:
+auctions that already have registrations are skipped unless --force is given,
+in which case their rows are replaced. When a plate store directory is given
+(or PLATE_STORE_DIR is set), a new version of the store is published from the
+registrations table whenever the store is missing or older than the newest
+loaded registration, so a rerun also repairs a publish that did not complete.
+"""
+import argparse
+import datetime
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+from app.api import normalize_many
+from app.plate_store import publish_plate_store, published_at
+from app.routes.scraper import parse_auction_html
+
+SPREADSHEET_EXTENSIONS = ('.xlsx', '.xls')
+HTML_EXTENSIONS = ('.html', '.htm')
+
+# auctions.auction_id is VARCHAR(10)
+MAX_AUCTION_ID_LENGTH = 10
+
+COPY_REGISTRATIONS_SQL = """
+    COPY registrations (auction_id, lot_number, registration, normalized_registration)
+    FROM STDIN
+"""
+
+def find_auction_files(directory):
+    """
+    Return a dict of auction_id -> file path for every supported file in the directory.
+    Files whose name cannot be used as an auction ID are reported and skipped.
+    """
+    auction_files = {}
+    for file_name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(file_name)
+        if extension.lower() not in SPREADSHEET_EXTENSIONS + HTML_EXTENSIONS:
+            continue
+        if len(stem) > MAX_AUCTION_ID_LENGTH:
+            print(f"Skipping {file_name}: auction ID '{stem}' is longer than {MAX_AUCTION_ID_LENGTH} characters")
+            continue
+        if stem in auction_files:
+            print(f"Skipping {file_name}: auction '{stem}' already provided by {auction_files[stem]}")
+            continue
+        auction_files[stem] = os.path.join(directory, file_name)
+    return auction_files
+
+def read_registrations(file_path):
+    """
+    Read (lot_number, registration) pairs from an archived spreadsheet or saved HTML page.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in HTML_EXTENSIONS:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            auction_data = parse_auction_html(file.read())
+        return [(item["lot_number"], item["registration"]) for item in auction_data]
+
+    # Same layout as create_upload_file: lot numbers in column A, registrations in column B.
+    # Incomplete rows are dropped as a whole so lot numbers stay paired with their registrations.
+    df = pd.read_excel(file_path, header=None, skiprows=5)
+    return list(df.iloc[:, [0, 1]].dropna().itertuples(index=False, name=None))
+
+def parse_auction_file(auction_id, file_path):
+    """
+    Parse one archived auction into rows ready for COPY.
+    Runs in a worker process. Returns (auction_id, rows, skipped) where rows is a list of
+    (lot_number, registration, normalized_registration) and skipped counts unusable lots.
+    """
+    registrations = read_registrations(file_path)
+
+    lot_numbers = []
+    plates = []
+    skipped = 0
+    for lot_number, registration in registrations:
+        try:
+            lot_numbers.append(int(float(str(lot_number).strip())))
+        except (ValueError, OverflowError):
+            # Header or footer rows that are not lots
+            skipped += 1
+            continue
+        plates.append(str(registration).strip())
+
+    rows = list(zip(lot_numbers, plates, normalize_many(plates)))
+    return auction_id, rows, skipped
+
+def escape_copy_value(value):
+    """
+    Escape a value for Postgres COPY text format.
+    """
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+def copy_rows(cursor, auction_id, rows, batch_size):
+    """
+    Stream rows into registrations with COPY, batch_size rows at a time.
+    """
+    escaped_auction_id = escape_copy_value(auction_id)
+    for start in range(0, len(rows), batch_size):
+        buffer = io.StringIO()
+        for lot_number, registration, normalized_registration in rows[start:start + batch_size]:
+            buffer.write(
+                f"{escaped_auction_id}\t{lot_number}\t"
+                f"{escape_copy_value(registration)}\t{escape_copy_value(normalized_registration)}\n"
+            )
+        buffer.seek(0)
+        cursor.copy_expert(COPY_REGISTRATIONS_SQL, buffer)
+
+def publish_registrations(conn, plate_store_dir, batch_size):
+    """
+    Publish a new plate store version containing every loaded registration.
+    """
+    def iter_rows():
+        # Named cursor so rows are streamed from the server instead of fetched at once
+        with conn.cursor(name="plate_store_export") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute("""
+                SELECT auction_id, lot_number, registration, normalized_registration
+                FROM registrations
+                WHERE normalized_registration IS NOT NULL
+                ORDER BY auction_id, lot_number
+            """)
+            yield from cursor
+
+    version = publish_plate_store(plate_store_dir, iter_rows())
+    conn.commit()
+    print(f"Published plate store version {version} to {plate_store_dir}")
+
+def plate_store_is_stale(conn, plate_store_dir):
+    """
+    Return True if the plate store has never been published or is older than the newest registration.
+    """
+    published = published_at(plate_store_dir)
+    if published is None:
+        return True
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT MAX(created_at) FROM registrations")
+        latest_load = cursor.fetchone()[0]
+    conn.commit()
+    return latest_load is not None and latest_load > published
+
+def get_loaded_auctions(cursor):
+    """
+    Return the set of auction IDs that already have registrations loaded.
+    """
+    cursor.execute("SELECT DISTINCT auction_id FROM registrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def load_auction(conn, auction_id, file_path, rows, batch_size):
+    """
+    Load one auction in a single transaction, replacing any existing registrations for it.
+    The archive does not record auction times, so the file's modification time is used
+    for start_time/end_time when the auction row does not exist yet.
+    """
+    file_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path), tz=datetime.timezone.utc)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO auctions (auction_id, start_time, end_time)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (auction_id) DO NOTHING
+                """,
+                (auction_id, file_time, file_time)
+            )
+            cursor.execute("DELETE FROM registrations WHERE auction_id = %s", (auction_id,))
+            copy_rows(cursor, auction_id, rows, batch_size)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def backfill(directory, database_url, workers=None, batch_size=5000, force=False, plate_store_dir=None):
+    """
+    Parse every auction file in the directory in parallel and load it into Postgres,
+    then publish a new plate store version if plate_store_dir is given and the store is
+    missing or behind the registrations table.
+    Returns the number of registrations loaded.
+    """
+    auction_files = find_auction_files(directory)
+    if not auction_files:
+        print(f"No auction files found in {directory}")
+        return 0
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            # Databases created before normalized plates were stored lack this column
+            cursor.execute(
+                "ALTER TABLE registrations ADD COLUMN IF NOT EXISTS normalized_registration VARCHAR(50)"
+            )
+            loaded_auctions = set() if force else get_loaded_auctions(cursor)
+        conn.commit()
+
+        pending = {
+            auction_id: file_path
+            for auction_id, file_path in auction_files.items()
+            if auction_id not in loaded_auctions
+        }
+        print(f"Found {len(auction_files)} auction files, {len(auction_files) - len(pending)} already loaded, "
+              f"{len(pending)} to load")
+
+        total_rows = 0
+        failed = []
+        start_time = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(parse_auction_file, auction_id, file_path): auction_id
+                for auction_id, file_path in pending.items()
+            }
+            for future in as_completed(futures):
+                auction_id = futures[future]
+                try:
+                    auction_id, rows, skipped = future.result()
+                    load_auction(conn, auction_id, pending[auction_id], rows, batch_size)
+                except Exception as e:
+                    print(f"Error loading auction {auction_id}: {str(e)}")
+                    failed.append(auction_id)
+                    continue
+
+                total_rows += len(rows)
+                elapsed = time.perf_counter() - start_time
+                rate = total_rows / elapsed if elapsed > 0 else 0
+                print(f"Loaded auction {auction_id}: {len(rows)} rows ({skipped} skipped), "
+                      f"{total_rows} total, {rate:,.0f} rows/s")
+
+        elapsed = time.perf_counter() - start_time
+        rate = total_rows / elapsed if elapsed > 0 else 0
+        print(f"Backfill finished: {total_rows} rows from {len(pending) - len(failed)} auctions "
+              f"in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+        if failed:
+            print(f"Failed auctions (rerun to retry): {', '.join(sorted(failed))}")
+
+        if plate_store_dir and (total_rows or plate_store_is_stale(conn, plate_store_dir)):
+            publish_registrations(conn, plate_store_dir, batch_size)
+        return total_rows
+    finally:
+        conn.close()
+
+def main(argv=None):
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Backfill historical auctions into the database.")
+    parser.add_argument("directory", help="Directory of archived auction spreadsheets or saved HTML pages")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""),
+                        help="Postgres URL (defaults to the DATABASE_URL environment variable)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of parser processes (defaults to the CPU count)")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="Rows sent per COPY batch")
+    parser.add_argument("--force", action="store_true",
+                        help="Reload auctions that already have registrations")
+    parser.add_argument("--plate-store", default=os.getenv("PLATE_STORE_DIR", ""),
+                        help="Plate store directory to publish to after loading "
+                             "(defaults to the PLATE_STORE_DIR environment variable)")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("No DATABASE_URL environment variable found and --database-url not given")
+    if not os.path.isdir(args.directory):
+        parser.error(f"Not a directory: {args.directory}")
+
+    backfill(args.directory, args.database_url, workers=args.workers,
+             batch_size=args.batch_size, force=args.force, plate_store_dir=args.plate_store)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Compact on-disk store of normalized plates shared by all uvicorn worker processes.
+
+Layout of a store directory:
+    CURRENT                      name of the published version
+    versions/<version>/plates.bin    fixed-width plate records
+    versions/<version>/ngrams.idx    sorted (bigram, offset, count) entries into postings.bin
+    versions/<version>/postings.bin  record indices for each bigram
+
+Workers memory-map the current version read-only, so the plate data lives once in
+the OS page cache however many workers are running. A new version is written to a
+temporary directory and published by atomically replacing CURRENT; readers notice
+the change on their next refresh() and map the new files.
+"""
+import datetime
+import mmap
+import os
+import shutil
+import struct
+import time
+
+# auction_id (VARCHAR(10)), lot_number, registration, normalized_registration
+RECORD = struct.Struct("<10sI16s16s")
+# bigram, offset into postings (in entries), number of postings
+NGRAM_ENTRY = struct.Struct("<2sII")
+POSTING = struct.Struct("<I")
+NGRAM_SIZE = 2
+
+# Without a shared bigram, partial_ratio between strings of at least 4 characters
+# is at most 75 (80 when the shorter string has 3 characters). The bigram
+# pre-filter is therefore only exact for cutoffs above 75, with plates and names
+# of SHORT_LENGTH characters or fewer always scored.
+MIN_PREFILTER_CUTOFF = 76
+SHORT_LENGTH = 3
+# Postings key for plates too short to be filtered by bigram; never a real bigram
+SHORT_KEY = b"\0\0"
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+PLATES_FILE = "plates.bin"
+NGRAMS_FILE = "ngrams.idx"
+POSTINGS_FILE = "postings.bin"
+
+# Older versions kept after a publish, for workers that have not refreshed yet
+KEEP_VERSIONS = 2
+
+def encode_field(value, size):
+    """
+    Encode a value as UTF-8 bytes truncated to the field size.
+    """
+    return str(value).encode('utf-8')[:size]
+
+def decode_field(value):
+    """
+    Decode a null-padded field back to a string.
+    """
+    return value.rstrip(b'\0').decode('utf-8', errors='ignore')
+
+def ngrams(value):
+    """
+    Return the set of byte bigrams in an encoded normalized plate or name.
+    """
+    return {value[i:i + NGRAM_SIZE] for i in range(len(value) - NGRAM_SIZE + 1)}
+
+def write_file(path, data):
+    with open(path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+def publish_plate_store(root, rows):
+    """
+    Write a new store version from rows of
+    (auction_id, lot_number, registration, normalized_registration)
+    and atomically make it the current version. Returns the version name.
+    """
+    versions_path = os.path.join(root, VERSIONS_DIR)
+    os.makedirs(versions_path, exist_ok=True)
+
+    plates = bytearray()
+    postings_by_ngram = {}
+    for index, (auction_id, lot_number, registration, normalized_registration) in enumerate(rows):
+        normalized = encode_field(normalized_registration, 16)
+        plates += RECORD.pack(
+            encode_field(auction_id, 10),
+            int(lot_number),
+            encode_field(registration, 16),
+            normalized
+        )
+        keys = [SHORT_KEY] if len(normalized) <= SHORT_LENGTH else ngrams(normalized)
+        for ngram in keys:
+            postings_by_ngram.setdefault(ngram, []).append(index)
+
+    ngram_index = bytearray()
+    postings = bytearray()
+    offset = 0
+    for ngram in sorted(postings_by_ngram):
+        record_indices = postings_by_ngram[ngram]
+        ngram_index += NGRAM_ENTRY.pack(ngram, offset, len(record_indices))
+        postings += struct.pack(f"<{len(record_indices)}I", *record_indices)
+        offset += len(record_indices)
+
+    version = str(time.time_ns())
+    temp_path = os.path.join(versions_path, f".tmp-{version}")
+    os.makedirs(temp_path)
+    write_file(os.path.join(temp_path, PLATES_FILE), plates)
+    write_file(os.path.join(temp_path, NGRAMS_FILE), ngram_index)
+    write_file(os.path.join(temp_path, POSTINGS_FILE), postings)
+    os.rename(temp_path, os.path.join(versions_path, version))
+
+    # Swap the CURRENT pointer in one step so readers see either the old or the new version
+    current_temp = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    write_file(current_temp, version.encode('utf-8'))
+    os.replace(current_temp, os.path.join(root, CURRENT_FILE))
+
+    # Files still mapped by a worker stay readable after being unlinked
+    old_versions = sorted(name for name in os.listdir(versions_path) if not name.startswith('.'))
+    for name in old_versions[:-(KEEP_VERSIONS + 1)]:
+        shutil.rmtree(os.path.join(versions_path, name), ignore_errors=True)
+
+    return version
+
+def published_at(root):
+    """
+    Return when the current version was published (UTC), or None if nothing has been published.
+    """
+    try:
+        mtime = os.path.getmtime(os.path.join(root, CURRENT_FILE))
+    except FileNotFoundError:
+        return None
+    return datetime.datetime.fromtimestamp(mtime, tz=datetime.timezone.utc)
+
+def map_file(path):
+    """
+    Memory-map a file read-only. Returns None for an empty file, which cannot be mapped.
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+class PlateStore:
+    """
+    Read-only view of the current version of a plate store.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.version = None
+        self._current_stat = None
+        self._plates = None
+        self._ngrams = None
+        self._postings = None
+
+    def refresh(self):
+        """
+        Map the current version if it changed since the last call.
+        Returns False if no version has been published yet. Raises OSError if the
+        current version's files cannot be mapped (e.g. pruned by a later publish);
+        the previously mapped version is then kept and the next call retries.
+        """
+        current_path = os.path.join(self.root, CURRENT_FILE)
+        try:
+            stat = os.stat(current_path)
+        except FileNotFoundError:
+            return False
+        current_stat = (stat.st_ino, stat.st_mtime_ns)
+        if current_stat == self._current_stat:
+            return True
+
+        with open(current_path, 'r') as file:
+            version = file.read().strip()
+        version_path = os.path.join(self.root, VERSIONS_DIR, version)
+        plates = map_file(os.path.join(version_path, PLATES_FILE))
+        ngram_index = map_file(os.path.join(version_path, NGRAMS_FILE))
+        postings = map_file(os.path.join(version_path, POSTINGS_FILE))
+
+        # Swap all three together only once every file is mapped, so they always
+        # belong to the same version. Old maps are released when the last reference goes away
+        self._plates, self._ngrams, self._postings = plates, ngram_index, postings
+        self.version = version
+        self._current_stat = current_stat
+        return True
+
+    def __len__(self):
+        return len(self._plates) // RECORD.size if self._plates else 0
+
+    def record(self, index):
+        """
+        Return (auction_id, lot_number, registration, normalized_registration) for a record.
+        """
+        auction_id, lot_number, registration, normalized_registration = RECORD.unpack_from(
+            self._plates, index * RECORD.size
+        )
+        return decode_field(auction_id), lot_number, decode_field(registration), decode_field(normalized_registration)
+
+    def _postings_for(self, ngram):
+        """
+        Binary search the bigram index and return the record indices for a bigram.
+        """
+        if not self._ngrams:
+            return ()
+        low, high = 0, len(self._ngrams) // NGRAM_ENTRY.size
+        while low < high:
+            middle = (low + high) // 2
+            entry_ngram, offset, count = NGRAM_ENTRY.unpack_from(self._ngrams, middle * NGRAM_ENTRY.size)
+            if entry_ngram < ngram:
+                low = middle + 1
+            elif entry_ngram > ngram:
+                high = middle
+            else:
+                return struct.unpack_from(f"<{count}I", self._postings, offset * POSTING.size)
+        return ()
+
+    def candidates(self, normalized_names, cutoff):
+        """
+        Return the sorted indices of records that can reach the cutoff for any name:
+        records sharing at least one bigram with a name, plus plates of SHORT_LENGTH
+        characters or fewer. The filter only drops records that cannot score at or above
+        the cutoff when cutoff >= MIN_PREFILTER_CUTOFF; for lower cutoffs, or names of
+        SHORT_LENGTH characters or fewer, every record is returned.
+        """
+        if cutoff < MIN_PREFILTER_CUTOFF:
+            return range(len(self))
+        record_indices = set(self._postings_for(SHORT_KEY))
+        for normalized_name in normalized_names:
+            encoded_name = str(normalized_name).encode('utf-8')
+            if len(encoded_name) <= SHORT_LENGTH:
+                return range(len(self))
+            for ngram in ngrams(encoded_name):
+                record_indices.update(self._postings_for(ngram))
+        return sorted(record_indices)
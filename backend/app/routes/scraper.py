@@ -1,40 +1,120 @@
+import asyncio
+import os
+import time
+from urllib.parse import urljoin
 from fastapi import APIRouter, HTTPException
 import httpx
 from bs4 import BeautifulSoup
 
 router = APIRouter()
 
+AUCTION_BASE_URL = "https://dvlaauction.co.uk"
+
+# Maximum number of lot detail pages fetched at the same time
+LOT_DETAIL_WORKERS = int(os.getenv('LOT_DETAIL_WORKERS', 8))
+# Seconds a fetched lot detail page is reused before being fetched again
+LOT_DETAIL_CACHE_TTL = int(os.getenv('LOT_DETAIL_CACHE_TTL', 300))
+
+# lot_url -> (expires_at, details)
+lot_details_cache = {}
+
+def select_text(soup, selector):
+    """
+    Return the stripped text of the first element matching the selector, or None if missing.
+    """
+    element = soup.select_one(selector)
+    return element.text.strip() if element else None
+
+def parse_auction_html(html):
+    """
+    Parse an auction listing page into a list of dictionaries: {lot_number, registration, lot_url}.
+    Shared by the live scraper and the historical backfill of saved pages.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    auction_data = []
+
+    for record in soup.select('tr.record.record-lot'):
+        lot_number = record.select_one('.field-id').text.strip()
+        registration = record.select_one('.field-name.data-text')['data-search']
+        link = record.select_one('a[href]')
+        lot_url = urljoin(AUCTION_BASE_URL, link['href']) if link else None
+
+        auction_data.append({
+            "lot_number": lot_number,
+            "registration": registration,
+            "lot_url": lot_url,
+        })
+
+    return auction_data
+
+def parse_lot_details(html):
+    """
+    Parse a lot detail page into a dictionary: {reserve_price, current_price, end_time}.
+    Fields missing from the page are returned as None.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    return {
+        "reserve_price": select_text(soup, '.field-reserve.data-gbp'),
+        "current_price": select_text(soup, '.field-current-price.data-gbp'),
+        "end_time": select_text(soup, '.field-end-time.data-datetime'),
+    }
+
+async def fetch_lot_details(lot_urls, max_workers=LOT_DETAIL_WORKERS):
+    """
+    Fetch detail pages for the given lots concurrently, at most max_workers at a time.
+    lot_urls is a dict of lot_number -> lot_url. Returns a dict of lot_number ->
+    {reserve_price, current_price, end_time, lot_url}. Pages fetched within the last
+    LOT_DETAIL_CACHE_TTL seconds are served from the cache; lots that fail to load are left out.
+    """
+    now = time.monotonic()
+    for lot_url in [url for url, (expires_at, _) in lot_details_cache.items() if expires_at <= now]:
+        del lot_details_cache[lot_url]
+
+    lot_details = {}
+    to_fetch = {}
+    for lot_number, lot_url in lot_urls.items():
+        cached = lot_details_cache.get(lot_url)
+        if cached:
+            lot_details[lot_number] = cached[1]
+        else:
+            to_fetch[lot_number] = lot_url
+
+    if not to_fetch:
+        return lot_details
+
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def fetch_one(client, lot_number, lot_url):
+        async with semaphore:
+            try:
+                response = await client.get(lot_url)
+                response.raise_for_status()
+            except httpx.HTTPError as exc:
+                print(f"Error fetching lot {lot_number} details: {str(exc)}")
+                return
+        details = parse_lot_details(response.text)
+        details["lot_url"] = lot_url
+        lot_details_cache[lot_url] = (time.monotonic() + LOT_DETAIL_CACHE_TTL, details)
+        lot_details[lot_number] = details
+
+    async with httpx.AsyncClient() as client:
+        await asyncio.gather(*(
+            fetch_one(client, lot_number, lot_url)
+            for lot_number, lot_url in to_fetch.items()
+        ))
+
+    return lot_details
+
 @router.get("/scrape/{auction_id}")
 async def scrape_auction_data(auction_id: str):
-    url = f"https://dvlaauction.co.uk/auction/{auction_id}"
+    url = f"{AUCTION_BASE_URL}/auction/{auction_id}"
     try:
         async with httpx.AsyncClient() as client:
             response = await client.get(url)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            auction_data = []
-
-            for record in soup.select('tr.record.record-lot'):
-                lot_number = record.select_one('.field-id').text.strip()
-                registration = record.select_one('.field-name.data-text')['data-search']
-                # reserve_price = record.select_one('.field-reserve.data-gbp').text.strip()
-                # current_price = record.select_one('.field-current-price.data-gbp').text.strip()
-                # end_time = record.select_one('.field-end-time.data-datetime').text.strip()
-                # lot_url = record.select_one('.field-lot-url').text.strip()
-
-                auction_data.append({
-                    "lot_number": lot_number,
-                    "registration": registration
-                    # ,
-                    # "reserve_price": reserve_price,
-                    # "current_price": current_price,
-                    # "end_time": end_time,
-                    # "lot_url": lot_url,
-                })
-
-            return auction_data
+            return parse_auction_html(response.text)
     except httpx.HTTPStatusError as exc:
         raise HTTPException(status_code=exc.response.status_code, detail=str(exc))
     except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(exc))
@@ -19,20 +19,29 @@ import { COOKIE_KEYS } from '@/constants/cookies';
 import { getCookieOptions } from '@/utils/cookieConfig';
 import StatusIndicators from '@/components/StatusIndicators';
 
+interface OtherMatch {
+  name: string;
+  similarity: number;
+}
+
 interface Comparison {
   lot_number: string;
   name: string;
   registration: string;
   normalized_registration: string;
   similarity: number;
-  // reserve_price?: string;
-  // current_price?: string;
-  // end_time?: string;
-  // lot_url?: string;
+  other_matches?: OtherMatch[];
+  reserve_price?: string | null;
+  current_price?: string | null;
+  end_time?: string | null;
+  lot_url?: string | null;
 }
 
 const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL;
 
+const formatOtherMatches = (otherMatches?: OtherMatch[]) =>
+  (otherMatches ?? []).map(match => `${match.name} (${match.similarity})`).join(', ');
+
 export default function Home() {
   const [file, setFile] = useState<File | null>(null);
   const [name, setName] = useState<string>('');
@@ -46,6 +55,8 @@ export default function Home() {
   });
   const [selectedName, setSelectedName] = useState<string>('All');
   const [auctionId, setAuctionId] = useState<string>('');
+  const [grouped, setGrouped] = useState<boolean>(false);
+  const [showLotDetails, setShowLotDetails] = useState<boolean>(false);
 
   // Load names from cookie on component mount
   useEffect(() => {
@@ -108,6 +119,7 @@ export default function Home() {
     const formData = new FormData();
     formData.append('file', file);
     formData.append('names', names.join(','));
+    formData.append('grouped', String(grouped));
 
     try {
       const response = await axios.post(`${backendUrl}/uploadfile/`, formData, {
@@ -116,6 +128,7 @@ export default function Home() {
         },
       });
       setData(response.data.comparisons);
+      setShowLotDetails(false);
     } catch (error) {
       if (axios.isAxiosError(error)) {
         console.error('Axios error:', error.response?.data);
@@ -129,7 +142,13 @@ export default function Home() {
   };
 
   const handleDownload = () => {
-    const worksheet = XLSX.utils.json_to_sheet(data);
+    const rows = grouped
+      ? data.map(({ other_matches, ...item }) => ({
+          ...item,
+          other_matches: formatOtherMatches(other_matches),
+        }))
+      : data;
+    const worksheet = XLSX.utils.json_to_sheet(rows);
     const workbook = XLSX.utils.book_new();
     XLSX.utils.book_append_sheet(workbook, worksheet, 'Comparisons');
     XLSX.writeFile(workbook, 'comparisons.xlsx');
@@ -150,6 +169,11 @@ export default function Home() {
     setAuctionId(e.target.value);
   };
 
+  const handleGroupedChange = (e: ChangeEvent<HTMLInputElement>) => {
+    setGrouped(e.target.checked);
+    setData([]);
+  };
+
   const handleScrape = async () => {
     if (!auctionId) {
       alert('Please enter an auction ID.');
@@ -159,7 +183,7 @@ export default function Home() {
     setIsLoading(true);
     try {
       const response = await axios.get(`${backendUrl}/scrape/${auctionId}`, {
-        params: { names: names.join(',') }
+        params: { names: names.join(','), grouped, enrich: true }
       });
       const auctionData = response.data.comparisons;
       console.log('Scraped data:', auctionData); // Debug message
@@ -168,13 +192,14 @@ export default function Home() {
         name: item.name,
         registration: item.registration,
         normalized_registration: item.normalized_registration,
-        similarity: item.similarity
-        // ,
-        // reserve_price: item.reserve_price,
-        // current_price: item.current_price,
-        // end_time: item.end_time,
-        // lot_url: item.lot_url,
+        similarity: item.similarity,
+        other_matches: item.other_matches,
+        reserve_price: item.reserve_price,
+        current_price: item.current_price,
+        end_time: item.end_time,
+        lot_url: item.lot_url,
       })));
+      setShowLotDetails(true);
     } catch (error) {
       console.error('Error scraping auction data:', error);
       alert('Error scraping auction data.');
@@ -187,37 +212,68 @@ export default function Home() {
     if (selectedName === 'All') {
       return data;
     }
-    return data.filter(item => item.name === selectedName);
+    return data.filter(item =>
+      item.name === selectedName ||
+      (item.other_matches ?? []).some(match => match.name === selectedName)
+    );
   }, [data, selectedName]);
 
   const columnHelper = createColumnHelper<Comparison>();
 
-  const columns = useMemo(() => [
-    columnHelper.accessor('lot_number', {
-      header: 'Lot Number',
-      cell: info => info.getValue(),
-    }),
-    columnHelper.accessor('name', {
-      header: 'Name',
-      cell: info => info.getValue(),
-    }),
-    columnHelper.accessor('registration', {
-      header: 'Registration',
-      cell: info => (
-        <span className={styles.registration}>
-          {info.getValue()}
-        </span>
-      ),
-    }),
-    columnHelper.accessor('normalized_registration', {
-      header: 'Normalized Registration',
-      cell: info => info.getValue(),
-    }),
-    columnHelper.accessor('similarity', {
-      header: 'Similarity',
-      cell: info => info.getValue(),
-    }),
-  ], [columnHelper]);
+  const columns = useMemo(() => {
+    const baseColumns = [
+      columnHelper.accessor('lot_number', {
+        header: 'Lot Number',
+        cell: info => info.getValue(),
+      }),
+      columnHelper.accessor('name', {
+        header: 'Name',
+        cell: info => info.getValue(),
+      }),
+      columnHelper.accessor('registration', {
+        header: 'Registration',
+        cell: info => (
+          <span className={styles.registration}>
+            {info.getValue()}
+          </span>
+        ),
+      }),
+      columnHelper.accessor('normalized_registration', {
+        header: 'Normalized Registration',
+        cell: info => info.getValue(),
+      }),
+      columnHelper.accessor('similarity', {
+        header: 'Similarity',
+        cell: info => info.getValue(),
+      }),
+    ];
+    const groupedColumns = grouped ? [
+      columnHelper.accessor(row => formatOtherMatches(row.other_matches), {
+        id: 'other_matches',
+        header: 'Other Matches',
+        cell: info => info.getValue(),
+      }),
+    ] : [];
+    // Lot details are only fetched for matched lots, so other rows show a dash
+    const lotDetailColumns = showLotDetails ? [
+      columnHelper.accessor(row => row.reserve_price ?? '-', {
+        id: 'reserve_price',
+        header: 'Reserve Price',
+        cell: info => info.getValue(),
+      }),
+      columnHelper.accessor(row => row.current_price ?? '-', {
+        id: 'current_price',
+        header: 'Current Price',
+        cell: info => info.getValue(),
+      }),
+      columnHelper.accessor(row => row.end_time ?? '-', {
+        id: 'end_time',
+        header: 'End Time',
+        cell: info => info.getValue(),
+      }),
+    ] : [];
+    return [...baseColumns, ...groupedColumns, ...lotDetailColumns];
+  }, [columnHelper, grouped, showLotDetails]);
 
   const table = useReactTable({
     data: filteredData,
@@ -258,6 +314,12 @@ export default function Home() {
               ))}
             </ul>
           </div>
+          <div className={styles.formGroup}>
+            <label>
+              <input type="checkbox" checked={grouped} onChange={handleGroupedChange} />
+              Group results by lot (best match per lot)
+            </label>
+          </div>
           <button 
             type="submit" 
             className={styles.submitButton}
@@ -334,7 +396,7 @@ export default function Home() {
                   <tr key={row.id}>
                     {row.getVisibleCells().map(cell => (
                       <td key={cell.id} className="field-name data-text">
-                        <a href="#">{flexRender(cell.column.columnDef.cell, cell.getContext())}</a>
+                        <a href={row.original.lot_url ?? '#'}>{flexRender(cell.column.columnDef.cell, cell.getContext())}</a>
                       </td>
                     ))}
                   </tr>
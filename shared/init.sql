@@ -11,6 +11,7 @@ CREATE TABLE IF NOT EXISTS registrations (
     auction_id VARCHAR(10) REFERENCES auctions(auction_id),
     lot_number INTEGER NOT NULL,
     registration VARCHAR(50) NOT NULL,
+    normalized_registration VARCHAR(50),
     starting_price DECIMAL(10,2),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
\ No newline at end of file